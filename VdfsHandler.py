@@ -1,15 +1,27 @@
 from argparse import ArgumentParser
+from collections import deque
+from collections.abc import Callable, Iterator
 from datetime import datetime
 from logging import DEBUG, ERROR, basicConfig, error, info
+from os import walk
+from os.path import join
 from pathlib import Path
+from re import IGNORECASE
+from re import compile as compile_pattern
+from re import escape
+from sys import stdout
+from typing import Any
 
 from zenkit import GameVersion, LogLevel, Vfs, VfsNode, set_logger_default
 
-from printColored import (enable_ansi_escape_sequences, print_colored,
-                          print_mixed)
+from printColored import (GREEN, RESET, YELLOW, enable_ansi_escape_sequences,
+                          print_colored)
+from uringIO import read_files, write_files
 
 enable_ansi_escape_sequences()
 
+_ROOT_MARKERS = frozenset({".", "\\", "/", ".\\", "./", ""})
+
 
 class NodeNotFound(Exception):
     def __init__(self, message: str = "") -> None:
@@ -31,7 +43,69 @@ class VdfNotLoaded(Exception):
         super().__init__(message)
 
 
+def _wildcard_matcher(wildcard: str) -> Callable[[str], Any]:
+    if "*" in wildcard:
+        pattern = ".*".join(escape(part) for part in wildcard.split("*"))
+        return compile_pattern(pattern, IGNORECASE).search
+    wildcard = wildcard.lower()
+    return lambda name: wildcard in name.lower()
+
+
+def _count_nodes(root: VfsNode, dir_index: dict[tuple[int, str], VfsNode]) -> int:
+    count = 0
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        parent_id = node.handle.value
+        for child in node:
+            name = child.name.lower()
+            dir_index[(parent_id, name)] = child
+            if child.is_dir():
+                queue.append(child)
+            else:
+                count += 1
+    return count
+
+
+def _raise_walk_error(error: OSError) -> None:
+    raise error
+
+
+def _push_sorted_children(
+    stack: deque[tuple[VfsNode, str, bool, str, bool]], parent: VfsNode, indent: str
+) -> None:
+    decorated = [(child.is_dir(), child.name, child) for child in parent]
+    decorated.sort(key=lambda x: (not x[0], x[1]))
+    total_children = len(decorated)
+    for index in range(total_children, 0, -1):
+        is_dir, name, child = decorated[index - 1]
+        stack.append((child, name, is_dir, indent, index == total_children))
+
+
+def _export_matching(
+    node: VfsNode, matches: Callable[[str], Any], export_dir: Path
+) -> None:
+    stack = deque([node])
+    while stack:
+        for child in stack.pop():
+            if child.is_dir():
+                stack.append(child)
+            elif matches(child.name):
+                (export_dir / child.name).write_bytes(child.data)
+
+
 class VdfsHandler:
+    __slots__ = (
+        "path",
+        "vdf_name",
+        "version_",
+        "vfs",
+        "_node_count",
+        "_name_index",
+        "_missing_names",
+        "_dir_index",
+        "_missing_children",
+    )
 
     def __init__(
         self,
@@ -39,12 +113,17 @@ class VdfsHandler:
         debugging=None,
         internal_debugging=None,
     ):
-        self.path = Path(vdf_archive) if Path(vdf_archive).exists() else None
+        archive = Path(vdf_archive) if vdf_archive else None
+        self.path = archive if archive and archive.exists() else None
         self.vdf_name = self._vdf_name(vdf_archive)
         self._toggle_debugging(debugging, internal_debugging)
 
         self.version_ = GameVersion.GOTHIC2
         self._node_count = 0
+        self._name_index: dict[str, VfsNode] = {}
+        self._missing_names: set[str] = set()
+        self._dir_index: dict[tuple[int, str], VfsNode] = {}
+        self._missing_children: set[tuple[int, str]] = set()
         self.vfs = self._initialize_vfs()
 
     @property
@@ -95,154 +174,150 @@ class VdfsHandler:
         set_logger_default(inner_level)
 
     def _initialize_vfs(self) -> Vfs:
-        def count_nodes(node: VfsNode) -> int:
-            for child in node:
-                if child.is_dir():
-                    self._node_count += count_nodes(child)
-                else:
-                    self._node_count += 1
-            return self._node_count
-
         vfs = Vfs()
         if self.path:
             if not self.path.is_file():
                 raise FileNotFoundError(f"{self.path.name} was not found!")
             vfs.mount_disk(self.path)
-        count_nodes(vfs.root)
+        self._node_count = _count_nodes(vfs.root, self._dir_index)
         return vfs
 
-    def _print_recursive(self, node: VfsNode, indent: str = "") -> None:
-        contents = [child for child in node]
-        contents.sort(key=lambda x: (not x.is_dir(), x.name))
-        total_children = len(contents)
-
-        for index, child in enumerate(contents, start=1):
-            is_last = index == total_children
-            if indent == "":
-                current_indent = "└── " if is_last else "├── "
+    def _find(self, name: str) -> VfsNode | None:
+        key = name.lower()
+        if key in self._missing_names:
+            return None
+        node = self._name_index.get(key)
+        if not node:
+            node = self.vfs.find(name)
+            if node:
+                self._name_index[key] = node
             else:
-                current_indent = indent + ("└── " if is_last else "├── ")
-            child_name = (
-                f"[{child.name.title()}]" if child.is_dir() else child.name.title()
-            )
-            if not child.is_dir():
-                print_mixed(
-                    "green", text=f"{current_indent}", colored_text=f"{child_name}"
-                )
+                self._missing_names.add(key)
+        return node
+
+    def _child(self, parent: VfsNode, name: str) -> VfsNode | None:
+        key = (parent.handle.value, name.lower())
+        if key in self._missing_children:
+            return None
+        node = self._dir_index.get(key)
+        if not node:
+            node = parent.get_child(name)
+            # Some zenkit versions return a node with a NULL handle on a miss
+            if node and node.handle.value:
+                self._dir_index[key] = node
             else:
-                print_mixed(
-                    "yellow", text=f"{current_indent}", colored_text=f"{child_name}"
-                )
-            if child.is_dir():
-                extension = "    " if is_last else "│   "
-                self._print_recursive(child, indent + extension)
-
-    def _build_file_tree(self, directory: str | Path) -> dict:
-        def add_to_tree(item, tree):
-            if item.is_dir():
-                sub_tree = []
-                for sub_item in item.iterdir():
-                    add_to_tree(sub_item, sub_tree)
-                tree.append({item.name: sub_tree})
-            else:
-                tree.append(str(item))
+                node = None
+                self._missing_children.add(key)
+        return node
+
+    def _create(self, parent: VfsNode, *args) -> VfsNode | None:
+        node = parent.create(*args)
+        if node:
+            key = node.name.lower()
+            # The new node may change which node vfs.find returns for this name
+            self._name_index.pop(key, None)
+            self._missing_names.discard(key)
+            child_key = (parent.handle.value, key)
+            self._dir_index[child_key] = node
+            self._missing_children.discard(child_key)
+        return node
+
+    def _remove(self, parent: VfsNode, node: VfsNode) -> bool:
+        self._dir_index.pop((parent.handle.value, node.name.lower()), None)
+        stale = [node]
+        stale_parents: set[int] = set()
+        while stale:
+            current = stale.pop()
+            self._name_index.pop(current.name.lower(), None)
+            if current.is_dir():
+                current_id = current.handle.value
+                stale_parents.add(current_id)
+                for child in current:
+                    self._dir_index.pop((current_id, child.name.lower()), None)
+                    stale.append(child)
+        if stale_parents:
+            # Freed node addresses can be reused by nodes created later
+            self._missing_children = {
+                key for key in self._missing_children if key[0] not in stale_parents
+            }
+        return parent.remove(node.name)
 
-        root_path = Path(directory)
-        tree = []
-        for item in root_path.iterdir():
-            add_to_tree(item, tree)
-
-        return {root_path.name: tree}
+    def _print_recursive(self, node: VfsNode, indent: str = "") -> None:
+        lines: list[str] = []
+        stack: deque[tuple[VfsNode, str, bool, str, bool]] = deque()
+
+        _push_sorted_children(stack, node, indent)
+        while stack:
+            child, name, is_dir, child_indent, is_last = stack.pop()
+            current_indent = child_indent + ("└── " if is_last else "├── ")
+            if not is_dir:
+                lines.append(f"{current_indent}{GREEN}{name.title()}{RESET}\n")
+            else:
+                lines.append(f"{current_indent}{YELLOW}[{name.title()}]{RESET}\n")
+                extension = "    " if is_last else "│   "
+                _push_sorted_children(stack, child, child_indent + extension)
+        stdout.write("".join(lines))
+
+    def _collect_exports(
+        self, node: VfsNode, destination: Path
+    ) -> Iterator[tuple[Path, bytes]]:
+        stack = deque([(node, destination)])
+        while stack:
+            current, target = stack.pop()
+            for item in current:
+                if item.is_dir():
+                    (target / item.name).mkdir(exist_ok=True, parents=True)
+                    stack.append((item, target / item.name))
+                else:
+                    yield target / item.name, item.data
 
     def _export_recursive(self, node: VfsNode, destination: str | Path):
-        for item in node:
-            if item.is_dir():
-                (Path(destination) / item.name).mkdir(exist_ok=True, parents=True)
-                self._export_recursive(item, Path(destination) / item.name)
-            else:
-                (Path(destination) / item.name).write_bytes(item.data)
+        write_files(self._collect_exports(node, Path(destination)))
 
     def _insert_recursive(
-        self,
-        source: str | Path | None = None,
-        node_tree: dict[str, dict | str] | None = None,
-        parent_node: VfsNode | None = None,
+        self, source: str | Path, parent_node: VfsNode | None = None
     ) -> None:
-        if not node_tree:
-            node_tree = self._build_file_tree(str(source))
-        for parent_name, children in node_tree.items():
-            parent = self.vfs.find(parent_name)
-            if not parent:
-                if not parent_node:
-                    parent_node = self.vfs.root
-                parent = parent_node.create(parent_name)
-            for child in children:
-                if isinstance(child, dict):
-                    sub_parent_name, sub_children = list(child.items())[0]
-                    new_tree = {sub_parent_name: sub_children}
-                    self._insert_recursive(node_tree=new_tree, parent_node=parent)
-                else:
-                    parent.create(Path(child).name, Path(child).read_bytes())
+        if not parent_node:
+            parent_node = self.vfs.root
+        source = str(source)
+        name = Path(source).name
+        nodes = {
+            source: self._child(parent_node, name) or self._create(parent_node, name)
+        }
+        pending: list[tuple[VfsNode, str, str]] = []
+        for root, dirs, files in walk(
+            source, onerror=_raise_walk_error, followlinks=True
+        ):
+            parent = nodes.pop(root)
+            for name in dirs:
+                path = join(root, name)
+                nodes[path] = self._child(parent, name) or self._create(parent, name)
+            for name in files:
+                pending.append((parent, name, join(root, name)))
+        contents = read_files(path for _, _, path in pending)
+        for (parent, name, _), data in zip(pending, contents):
+            self._create(parent, name, data)
 
     def _insert_dir(
-        self, internal_path: str | Path, parent: VfsNode | None = None
+        self,
+        internal_path: str | Path | tuple[str, ...],
+        parent: VfsNode | None = None,
     ) -> VfsNode | None:
-        path_tail = self.vfs.find(Path(internal_path).name)
-        if path_tail:
-            if len(Path(internal_path).parts) == 1:
-                if self.vfs.root.get_child(path_tail.name):
-                    return path_tail
-                else:
-                    return self.vfs.root.create(path_tail.name)
-            exists = 1
-            internal_path_parts = enumerate(Path(internal_path).parts)
-            for index, part in internal_path_parts:
-                if index == len(Path(internal_path).parts) - 1:
-                    node = self.vfs.find(part)
-                    if not node:
-                        exists -= 1
-                        break
-                    else:
-                        break
-                node = self.vfs.find(part)
-                matching = node.get_child(Path(internal_path).parts[index + 1])
-                if not matching:
-                    exists -= 1
-                    break
-            if exists == 1:
-                return path_tail
-        internal_path_parts = enumerate(Path(internal_path).parts)
-        for index, part in internal_path_parts:
-            if index == len(Path(internal_path).parts) - 1:
-                node = self.vfs.find(part)
-                new_parent = None
-                if not node:
-                    if not parent:
-                        new_parent = self.vfs.root.create(part)
-                        return new_parent
-                    else:
-                        new_parent = parent.create(part)
-                        return new_parent
-                else:
-                    return node
-            node = self.vfs.find(part)
-            new_parent = None
-            if not node:
-                if not parent:
-                    new_parent = self.vfs.root.create(part)
-                else:
-                    new_parent = parent.create(part)
-                self._insert_dir(
-                    "/".join(Path(internal_path).parts[index + 1 : :]), new_parent
-                )
-            else:
-                self._insert_dir(
-                    "/".join(Path(internal_path).parts[index + 1 : :]), node
-                )
+        parts = (
+            internal_path
+            if isinstance(internal_path, tuple)
+            else Path(internal_path).parts
+        )
+        if not parts:
+            return None
+        node = parent or self.vfs.root
+        for part in parts:
+            node = self._child(node, part) or self._create(node, part)
+        return node
 
     def get_file(self, file_name: str) -> VfsNode | None:
         info(f"Loading {file_name}...")
-        file = self.vfs.find(file_name)
+        file = self._find(file_name)
         if file:
             return file
         info(f"Failed to load {file_name}!")
@@ -266,61 +341,49 @@ class VdfsHandler:
                 raise ValueError(
                     "Nor the source path or content for the file was provided"
                 )
-            if not len(Path(internal_path).parts) > 1:
-                result = self.vfs.root.create(internal_path.upper(), content)
+            ipath = Path(internal_path)
+            if not len(ipath.parts) > 1:
+                result = self._create(self.vfs.root, internal_path.upper(), content)
                 return result
-            internal_parent = self._insert_dir(Path(internal_path).parent)
-            result = internal_parent.create(Path(internal_path).name.upper(), content)
+            internal_parent = self._insert_dir(ipath.parts[:-1])
+            result = self._create(internal_parent, ipath.name.upper(), content)
             return result
         info(f"Inserting from {source_path}...")
-        if Path(source_path).is_dir():
-            if not internal_path or internal_path in [".", "\\", "/", ".\\", "./"]:
-                self._insert_recursive(source_path)
+        spath = Path(source_path)
+        if spath.is_dir():
+            if not internal_path or internal_path in _ROOT_MARKERS:
+                self._insert_recursive(spath)
                 return
             internal_parent = self._insert_dir(internal_path)
-            self._insert_recursive(source_path, parent_node=internal_parent)
+            self._insert_recursive(spath, parent_node=internal_parent)
             return
-        if not internal_path or internal_path in [".", "\\", "/", ".\\", "./"]:
-            result = self.vfs.root.create(
-                Path(source_path).name.upper(), Path(source_path).read_bytes()
-            )
+        if not internal_path or internal_path in _ROOT_MARKERS:
+            result = self._create(self.vfs.root, spath.name.upper(), spath.read_bytes())
             return result
         internal_parent = self._insert_dir(internal_path)
-        result = internal_parent.create(
-            Path(source_path).name.upper(), Path(source_path).read_bytes()
-        )
+        result = self._create(internal_parent, spath.name.upper(), spath.read_bytes())
         return result
 
     def export_file(
         self, node_name: str, destination: str | Path, all_with_name: bool = False
     ) -> None:
-        def traverse(node: VfsNode, target: str, export_dir: str | Path):
-            for child in node:
-                if child.is_dir():
-                    traverse(child, target, export_dir)
-                else:
-                    if target.lower() in child.name.lower():
-                        (Path(export_dir) / child.name).write_bytes(child.data)
-
-        if not destination:
-            destination = Path.cwd()
-        Path(destination).mkdir(parents=True, exist_ok=True)
-        node = self.vfs.find(node_name)
+        destination = Path(destination) if destination else Path.cwd()
+        destination.mkdir(parents=True, exist_ok=True)
+        node = self._find(node_name)
         if not all_with_name:
             if not node:
                 raise NodeNotFound(f"{node_name} not found")
             if node.is_dir():
                 self._export_recursive(node, destination)
             else:
-                (Path(destination) / node.name).write_bytes(node.data)
+                (destination / node.name).write_bytes(node.data)
         else:
-            traverse(self.vfs.root, node_name, destination)
+            _export_matching(self.vfs.root, _wildcard_matcher(node_name), destination)
 
     def export_all(self, destination: str | Path) -> None:
         info(f"Exporting all files from {self.archive_name}...")
-        if not destination:
-            destination = Path.cwd()
-        Path(destination).mkdir(parents=True, exist_ok=True)
+        destination = Path(destination) if destination else Path.cwd()
+        destination.mkdir(parents=True, exist_ok=True)
         try:
             self._export_recursive(self.vfs.root, destination)
         except Exception as err:
@@ -334,26 +397,30 @@ class VdfsHandler:
         if not parent:
             parent = self.vfs.root
         if not all_with_name:
-            if not self.vfs.find(file_name):
+            if not self._find(file_name):
                 raise NodeNotFound(f"{file_name} not found")
         info(f"Removing {file_name}...")
+        target = file_name.lower()
+        matches = _wildcard_matcher(file_name)
         try:
-            for node in parent:
-                if not all_with_name:
-                    if node.is_dir():
-                        if node.name.lower() == file_name:
-                            parent.remove(node.name)
-                        else:
-                            self.remove_file(file_name, node)
-                    else:
-                        if node.name.lower() == file_name:
-                            parent.remove(node.name)
-                else:
-                    if node.is_dir():
-                        self.remove_file(file_name, node, True)
+            removals: list[tuple[VfsNode, VfsNode]] = []
+            stack = deque([parent])
+            while stack:
+                current = stack.pop()
+                for node in current:
+                    name = node.name.lower()
+                    if not all_with_name:
+                        if name == target:
+                            removals.append((current, node))
+                        elif node.is_dir():
+                            stack.append(node)
                     else:
-                        if file_name.lower() in node.name.lower():
-                            parent.remove(node.name)
+                        if node.is_dir():
+                            stack.append(node)
+                        elif matches(name):
+                            removals.append((current, node))
+            for current, node in removals:
+                self._remove(current, node)
         except Exception as err:
             error(f"Failed to remove {file_name} due to an unhandled exception: {err}")
         else:
@@ -365,8 +432,9 @@ class VdfsHandler:
                 destination = Path.cwd() / self.archive_name
             else:
                 destination = self.path
-        if "." not in Path(destination).name:
-            destination = Path(destination) / self.archive_name
+        destination = Path(destination)
+        if "." not in destination.name:
+            destination = destination / self.archive_name
         try:
             info(f"Saving VDF archive as {destination}...")
             self.vfs.save(destination, self.game_version)
@@ -479,16 +547,11 @@ def parse_args() -> dict:
 
 def main() -> None:
     args = parse_args()
-    if (
-        args["archive_path"][-4:]
-        not in [".vdf", ".mod"]
-        # or not Path(args["archive_path"]).exists()
-    ):
-        print_colored(
-            "red", f"Aborting: {args['archive_path']} is not a valid VDF archive."
-        )
+    archive = args["archive_path"]
+    if not archive.lower().endswith((".vdf", ".mod")):
+        print_colored("red", f"Aborting: {archive} is not a valid VDF archive.")
         exit()
-    vfs = VdfsHandler(args["archive_path"])
+    vfs = VdfsHandler(archive)
 
     if args["gothic1"]:
         vfs.game_version = "g1"
@@ -515,7 +578,7 @@ def main() -> None:
             if "*" not in node:
                 vfs.export_file(node, path)
                 exit()
-            wildcard = node.split("*")[1]
+            wildcard = node.split("*", 1)[1]
             vfs.export_file(wildcard, path, all_with_name=True)
             exit()
         print_colored("red", f"Aborting: {vfs.archive_name} is empty.")
@@ -534,11 +597,13 @@ def main() -> None:
             vfs.insert_file(vdf_path, input_path)
             vfs.save_vdf(output_path)
             exit()
-        parent_directory, wildcard = input_path.split("*")
+        parent_directory, wildcard = input_path.split("*", 1)
+        matches = _wildcard_matcher(wildcard)
         if parent_directory:
-            if Path(parent_directory).exists():
-                for file in Path(parent_directory).iterdir():
-                    if wildcard.lower() in file.name.lower():
+            parent_path = Path(parent_directory)
+            if parent_path.exists():
+                for file in parent_path.iterdir():
+                    if matches(file.name):
                         vfs.insert_file(vdf_path, file)
                 vfs.save_vdf(output_path)
                 exit()
@@ -547,7 +612,7 @@ def main() -> None:
                 exit()
         else:
             for file in Path().iterdir():
-                if wildcard.lower() in file.name.lower():
+                if matches(file.name):
                     vfs.insert_file(vdf_path, file)
             vfs.save_vdf(output_path)
             exit()
@@ -559,7 +624,7 @@ def main() -> None:
                 vfs.remove_file(node)
                 vfs.save_vdf(output_path)
                 exit()
-            wildcard = node.split("*")[1]
+            wildcard = node.split("*", 1)[1]
             vfs.remove_file(wildcard, all_with_name=True)
             vfs.save_vdf(output_path)
             exit()
@@ -3,6 +3,12 @@ from os import system
 from sys import stdout
 
 CLEAR = "cls" if os_name == "nt" else "clear"
+RED = "\x1b[31m"
+GREEN = "\x1b[32m"
+YELLOW = "\x1b[33m"
+BLUE = "\x1b[34m"
+RESET = "\x1b[0m"
+_COLORS: dict[str, str] = {"red": RED, "green": GREEN, "yellow": YELLOW, "blue": BLUE}
 
 
 def enable_ansi_escape_sequences():
@@ -27,14 +33,7 @@ def print_colored(color: str, *text: str, end: str = "\n", clear: bool = False)
     """
     if clear:
         system(CLEAR)
-    colors: dict[str, str] = {
-        "red": "\x1b[31m",
-        "green": "\x1b[32m",
-        "yellow": "\x1b[33m",
-        "blue": "\x1b[34m",
-    }
-    reset = "\x1b[0m"
-    _ = stdout.write(colors.get(color, "") + "".join(text) + reset + end)
+    _ = stdout.write(_COLORS.get(color, "") + "".join(text) + RESET + end)
 
 
 def print_mixed(
@@ -54,11 +53,10 @@ def print_mixed(
     colored_text = (
         "".join(colored_text) if isinstance(colored_text, list) else colored_text
     )
+    if clear:
+        system(CLEAR)
+    colored = _COLORS.get(color, "")
     if colored_first:
-        if clear:
-            system(CLEAR)
-        print_colored(color, colored_text, end="", clear=False)
-        stdout.write(white_text + end)
+        _ = stdout.write(f"{colored}{colored_text}{RESET}{white_text}{end}")
     else:
-        stdout.write(white_text)
-        print_colored(color, colored_text, end=end, clear=clear)
+        _ = stdout.write(f"{white_text}{colored}{colored_text}{RESET}{end}")
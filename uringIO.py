@@ -0,0 +1,183 @@
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from errno import ECANCELED
+from itertools import islice
+from os import cpu_count, stat
+from pathlib import Path
+
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+BATCH_SIZE = 256
+FILE_MODE = 0o666
+LARGE_FILE_SIZE = 1 << 20
+PARALLEL_THRESHOLD = 4
+MAX_WORKERS = (cpu_count() or 1) * 2
+# Low bit of user_data marking the read/write in each open/transfer/close chain;
+# the remaining bits hold the file's index in the batch
+TRANSFER = 1
+
+
+def _setup_ring():
+    if liburing is None:
+        return None
+    ring = liburing.Ring()
+    try:
+        liburing.io_uring_queue_init(BATCH_SIZE * 3, ring)
+    except OSError:
+        # io_uring may be disabled by the kernel or a seccomp policy
+        return None
+    try:
+        liburing.io_uring_register_files_sparse(ring, BATCH_SIZE)
+    except OSError:
+        liburing.io_uring_queue_exit(ring)
+        return None
+    return ring
+
+
+def _submit_writes(ring, cqe, chunk: list[tuple[Path, bytes]]) -> None:
+    for index, (path, data) in enumerate(chunk):
+        # Open into a fixed file slot so the linked write and close can refer to it
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_open_direct(
+            sqe,
+            path,
+            liburing.O_WRONLY | liburing.O_CREAT | liburing.O_TRUNC,
+            index,
+            FILE_MODE,
+        )
+        liburing.io_uring_sqe_set_data64(sqe, index << 1)
+        sqe.flags |= liburing.IOSQE_IO_LINK
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_write(sqe, index, data)
+        liburing.io_uring_sqe_set_data64(sqe, index << 1 | TRANSFER)
+        sqe.flags |= liburing.IOSQE_IO_LINK | liburing.IOSQE_FIXED_FILE
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_close_direct(sqe, index)
+        liburing.io_uring_sqe_set_data64(sqe, index << 1)
+
+    results = _reap(ring, cqe, [path for path, _ in chunk])
+    for index, (path, data) in enumerate(chunk):
+        if results[index] != len(data):
+            raise OSError(f"Short write to {path}")
+
+
+def _read_file(path: str | Path) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def _submit_reads(ring, cqe, chunk: list[str | Path]) -> Iterator[bytes]:
+    # Large files are read straight into a single bytes object on demand instead
+    # of being staged in a batch buffer and copied out of it
+    buffers = {}
+    for index, path in enumerate(chunk):
+        size = stat(path).st_size
+        if size < LARGE_FILE_SIZE:
+            buffers[index] = bytearray(size)
+    for index, buffer in buffers.items():
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_open_direct(sqe, chunk[index], liburing.O_RDONLY, index)
+        liburing.io_uring_sqe_set_data64(sqe, index << 1)
+        sqe.flags |= liburing.IOSQE_IO_LINK
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_read(sqe, index, buffer)
+        liburing.io_uring_sqe_set_data64(sqe, index << 1 | TRANSFER)
+        sqe.flags |= liburing.IOSQE_IO_LINK | liburing.IOSQE_FIXED_FILE
+        sqe = liburing.io_uring_get_sqe(ring)
+        liburing.io_uring_prep_close_direct(sqe, index)
+        liburing.io_uring_sqe_set_data64(sqe, index << 1)
+
+    results = _reap(ring, cqe, chunk)
+    for index, path in enumerate(chunk):
+        buffer = buffers.pop(index, None)
+        if buffer is None:
+            yield _read_file(path)
+        else:
+            # The file may have shrunk between stat and read
+            yield bytes(memoryview(buffer)[: results[index]])
+
+
+def _reap(ring, cqe, paths: list[str | Path]) -> dict[int, int]:
+    results = {}
+    failed = None
+    for _ in range(liburing.io_uring_submit(ring)):
+        liburing.io_uring_wait_cqe(ring, cqe)
+        entry = cqe[0]
+        user_data = entry.user_data
+        index = user_data >> 1
+        try:
+            # liburing raises on a negative res instead of returning it
+            result = entry.res
+        except OSError as error:
+            # Entries linked after a failed one complete with ECANCELED, so keep
+            # looking for the error that caused them
+            if failed is None or failed.errno == ECANCELED:
+                failed = OSError(error.errno, error.strerror, str(paths[index]))
+            continue
+        finally:
+            liburing.io_uring_cqe_seen(ring, entry)
+        if user_data & TRANSFER:
+            results[index] = result
+    if failed:
+        raise failed
+    return results
+
+
+def _write_file(item: tuple[Path, bytes]) -> None:
+    path, data = item
+    path.write_bytes(data)
+
+
+def _write_parallel(files: Iterator[tuple[Path, bytes]]) -> None:
+    chunk = list(islice(files, BATCH_SIZE))
+    if len(chunk) <= PARALLEL_THRESHOLD:
+        for item in chunk:
+            _write_file(item)
+        return
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        while chunk:
+            for _ in pool.map(_write_file, chunk):
+                pass
+            chunk = list(islice(files, BATCH_SIZE))
+
+
+def write_files(files: Iterable[tuple[Path, bytes]]) -> None:
+    """
+    Writes each `(path, data)` pair, batching open/write/close through io_uring when available.
+    ------------------------------------------
+    Falls back to `Path.write_bytes` on a thread pool if liburing is not installed or io_uring is unavailable.
+    """
+    files = iter(files)
+    ring = _setup_ring()
+    if ring is None:
+        _write_parallel(files)
+        return
+    cqe = liburing.Cqe()
+    try:
+        while chunk := list(islice(files, BATCH_SIZE)):
+            _submit_writes(ring, cqe, chunk)
+    finally:
+        liburing.io_uring_queue_exit(ring)
+
+
+def read_files(paths: Iterable[str | Path]) -> Iterator[bytes]:
+    """
+    Yields the contents of each path in order, batching open/read/close through io_uring when available.
+    ------------------------------------------
+    Falls back to `Path.read_bytes` if liburing is not installed or io_uring is unavailable.
+    """
+    paths = iter(paths)
+    ring = _setup_ring()
+    if ring is None:
+        for path in paths:
+            yield _read_file(path)
+        return
+    cqe = liburing.Cqe()
+    try:
+        while chunk := list(islice(paths, BATCH_SIZE)):
+            yield from _submit_reads(ring, cqe, chunk)
+    finally:
+        liburing.io_uring_queue_exit(ring)